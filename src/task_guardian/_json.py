@@ -0,0 +1,31 @@
+"""JSON encode/decode through orjson or ujson when installed, else the stdlib."""
+from __future__ import annotations
+import json
+from typing import Any
+
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
+
+ujson = None
+if orjson is None:
+    try:
+        import ujson  # type: ignore
+    except ImportError:
+        pass
+
+def dumps(obj: Any, *, indent: bool = False) -> str:
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, default=str, option=option).decode()
+    if ujson is not None:
+        return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False, indent=2 if indent else 0, default=str)
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None, default=str)
+
+def loads(s: str | bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(s)
+    if ujson is not None:
+        return ujson.loads(s)
+    return json.loads(s)
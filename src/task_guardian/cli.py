@@ -1,22 +1,48 @@
 from __future__ import annotations
 
 import argparse
-import json
+import contextlib
+import io
 import sys
-import uuid
-from datetime import datetime, timezone
 
+from . import __version__
 from .config import load_config
-from .scheduler import next_run_iso, parse_window
-from .store import TaskStore
-from .task_runner import run_due, run_task_id
+
+# `tg runs` streams its output instead of building the whole list at this --limit and above.
+_STREAM_MIN_LIMIT = 500
 
 
 def _print(obj) -> None:
-    print(json.dumps(obj, indent=2, ensure_ascii=False))
+    # Imported here so --help / --version don't load a JSON backend.
+    from . import _json
+
+    print(_json.dumps(obj, indent=True))
+
+
+def _stream_print_list(header: dict, key: str, items) -> None:
+    """
+    Write {**header, key: [...], "count": n} to stdout one item at a time.
+    The count goes last since it is only known once `items` is exhausted.
+    """
+    from . import _json
+
+    out = sys.stdout
+    out.write("{\n")
+    for k, v in header.items():
+        out.write(f"  {_json.dumps(k)}: " + _json.dumps(v, indent=True).replace("\n", "\n  ") + ",\n")
+    out.write(f"  {_json.dumps(key)}: [")
+    n = 0
+    for item in items:
+        out.write(",\n    " if n else "\n    ")
+        out.write(_json.dumps(item, indent=True).replace("\n", "\n    "))
+        n += 1
+    out.write("\n  ]" if n else "]")
+    out.write(f',\n  "count": {n}\n}}\n')
 
 
 def cmd_init(_a) -> int:
+    from .store import TaskStore
+
     cfg = load_config()
     TaskStore(cfg.db_path)
     _print({"ok": True, "db_path": str(cfg.db_path)})
@@ -24,6 +50,9 @@ def cmd_init(_a) -> int:
 
 
 def cmd_add(a) -> int:
+    from .scheduler import next_run_iso
+    from .store import TaskStore
+
     cfg = load_config()
     store = TaskStore(cfg.db_path)
 
@@ -58,6 +87,8 @@ def cmd_add(a) -> int:
 
 
 def cmd_run_due(a) -> int:
+    from .task_runner import run_due
+
     cfg = load_config()
     out = run_due(cfg=cfg, limit=a.limit, marker_name=a.marker, active_markers_only=a.active_markers_only)
     _print(out)
@@ -65,6 +96,8 @@ def cmd_run_due(a) -> int:
 
 
 def cmd_run_task(a) -> int:
+    from .task_runner import run_task_id
+
     cfg = load_config()
     out = run_task_id(cfg=cfg, task_id=a.id)
     _print(out)
@@ -72,36 +105,51 @@ def cmd_run_task(a) -> int:
 
 
 def cmd_runs(a) -> int:
+    from .store import TaskStore
+
     cfg = load_config()
     store = TaskStore(cfg.db_path)
+    if a.limit >= _STREAM_MIN_LIMIT:
+        _stream_print_list({}, "runs", (r._asdict() for r in store.iter_runs(limit=a.limit)))
+        return 0
     runs = store.list_runs(limit=a.limit)
-    _print({"count": len(runs), "runs": [r.__dict__ for r in runs]})
+    _print({"count": len(runs), "runs": [r._asdict() for r in runs]})
     return 0
 
 
 def cmd_report(a) -> int:
+    from datetime import datetime, timezone
+
+    from .scheduler import parse_window
+    from .store import TaskStore
+
     cfg = load_config()
     store = TaskStore(cfg.db_path)
     td = parse_window(a.window)
     since = (datetime.now(timezone.utc) - td).isoformat()
-    runs = store.runs_in_window(since_iso=since)
-    ok = sum(1 for r in runs if r.status == "success")
-    fail = sum(1 for r in runs if r.status == "fail")
-    _print({"window": a.window, "since": since, "runs": len(runs), "success": ok, "fail": fail})
+    counts = store.count_runs_by_status(since_iso=since)
+    _print({"window": a.window, "since": since, "runs": sum(counts.values()),
+            "success": counts.get("success", 0), "fail": counts.get("fail", 0)})
     return 0
 
 
 # ---- marker commands (will work once store has marker methods) ----
 
 def cmd_marker_create(a) -> int:
+    import secrets
+
+    from .store import TaskStore
+
     cfg = load_config()
     store = TaskStore(cfg.db_path)
-    store.create_marker(marker_id=uuid.uuid4().hex, name=a.name)
+    store.create_marker(marker_id=secrets.token_hex(16), name=a.name)
     _print({"ok": True, "marker": a.name})
     return 0
 
 
 def cmd_marker_list(a) -> int:
+    from .store import TaskStore
+
     cfg = load_config()
     store = TaskStore(cfg.db_path)
     _print({"markers": store.list_markers(limit=a.limit)})
@@ -109,6 +157,8 @@ def cmd_marker_list(a) -> int:
 
 
 def cmd_marker_add_task(a) -> int:
+    from .store import TaskStore
+
     cfg = load_config()
     store = TaskStore(cfg.db_path)
     store.add_task_to_marker(marker_name=a.name, task_id=a.task_id)
@@ -117,6 +167,8 @@ def cmd_marker_add_task(a) -> int:
 
 
 def cmd_marker_status(a) -> int:
+    from .store import TaskStore
+
     cfg = load_config()
     store = TaskStore(cfg.db_path)
     _print(store.marker_status(marker_name=a.name))
@@ -124,6 +176,8 @@ def cmd_marker_status(a) -> int:
 
 
 def cmd_marker_close(a) -> int:
+    from .store import TaskStore
+
     cfg = load_config()
     store = TaskStore(cfg.db_path)
     store.close_marker(name=a.name)
@@ -133,85 +187,149 @@ def cmd_marker_close(a) -> int:
 
 
 def cmd_marker_reset(a) -> int:
+    from .store import TaskStore
+
     cfg = load_config()
     store = TaskStore(cfg.db_path)
     store.reset_marker(name=a.name)
     _print({"ok": True, "marker": a.name, "reset": True})
     return 0
 
-def build_parser() -> argparse.ArgumentParser:
-    p = argparse.ArgumentParser(prog="tg", description="Task Guardian CLI")
-    sub = p.add_subparsers(dest="cmd", required=True)
+_COMMANDS = ("init", "add", "run-task", "run-due", "runs", "report", "marker")
+_MARKER_COMMANDS = ("create", "list", "add-task", "status", "reset", "close")
 
-    s = sub.add_parser("init")
-    s.set_defaults(fn=cmd_init)
-
-    s = sub.add_parser("add")
-    s.add_argument("--id", required=True)
-    s.add_argument("--name", required=True)
-    s.add_argument("--tool", required=True, choices=["exec", "gh", "http_request"])
-    s.add_argument("--command")
-    s.add_argument("--url")
-    s.add_argument("--timeout", type=int, default=300)
-    s.add_argument("--schedule", required=True)
-    s.add_argument("--expected", default="task completes successfully")
-    s.add_argument("--verify", default="file_exists", choices=["file_exists", "exit_code_0"])
-    s.add_argument("--output")
-    s.add_argument("--disabled", action="store_true")
-    s.set_defaults(fn=cmd_add)
-
-    s = sub.add_parser("run-task")
-    s.add_argument("--id", required=True)
-    s.set_defaults(fn=cmd_run_task)
-
-    s = sub.add_parser("run-due")
-    s.add_argument("--limit", type=int, default=25)
-    s.add_argument("--marker", help="Run only tasks in this active marker")
-    s.add_argument("--active-markers-only", action="store_true", help="Run only tasks belonging to any active marker")
-    s.set_defaults(fn=cmd_run_due)
-
-    s = sub.add_parser("runs")
-    s.add_argument("--limit", type=int, default=50)
-    s.set_defaults(fn=cmd_runs)
-
-    s = sub.add_parser("report")
-    s.add_argument("--window", default="24h")
-    s.set_defaults(fn=cmd_report)
 
-    m = sub.add_parser("marker", help="marker operations")
-    ms = m.add_subparsers(dest="marker_cmd", required=True)
+def _sniff_subcommand(argv: list[str], names: tuple[str, ...]) -> str | None:
+    """First positional token of argv if it names a known command; None on --help or no match."""
+    for tok in argv:
+        if tok in ("-h", "--help"):
+            return None
+        if tok.startswith("-"):
+            continue
+        return tok if tok in names else None
+    return None
 
-    mc = ms.add_parser("create")
-    mc.add_argument("--name", required=True)
-    mc.set_defaults(fn=cmd_marker_create)
 
-    ml = ms.add_parser("list")
-    ml.add_argument("--limit", type=int, default=50)
-    ml.set_defaults(fn=cmd_marker_list)
+def build_parser(only: str | None = None, marker_only: str | None = None) -> argparse.ArgumentParser:
+    """Build the CLI parser; when `only`/`marker_only` are set, wire up just that subcommand."""
+    def want(name: str) -> bool:
+        return only is None or only == name
 
-    ma = ms.add_parser("add-task")
-    ma.add_argument("--name", required=True)
-    ma.add_argument("--task-id", required=True)
-    ma.set_defaults(fn=cmd_marker_add_task)
+    def want_marker(name: str) -> bool:
+        return marker_only is None or marker_only == name
 
-    mst = ms.add_parser("status")
-    mst.add_argument("--name", required=True)
-    mst.set_defaults(fn=cmd_marker_status)
+    p = argparse.ArgumentParser(prog="tg", description="Task Guardian CLI")
+    p.add_argument("-V", "--version", action="version", version=f"tg {__version__}")
+    sub = p.add_subparsers(dest="cmd", required=True)
 
-    mrst = ms.add_parser("reset")
-    mrst.add_argument("--name", required=True)
-    mrst.set_defaults(fn=cmd_marker_reset)
+    if want("init"):
+        s = sub.add_parser("init")
+        s.set_defaults(fn=cmd_init)
+
+    if want("add"):
+        s = sub.add_parser("add")
+        s.add_argument("--id", required=True)
+        s.add_argument("--name", required=True)
+        s.add_argument("--tool", required=True, choices=["exec", "gh", "http_request"])
+        s.add_argument("--command")
+        s.add_argument("--url")
+        s.add_argument("--timeout", type=int, default=300)
+        s.add_argument("--schedule", required=True)
+        s.add_argument("--expected", default="task completes successfully")
+        s.add_argument("--verify", default="file_exists", choices=["file_exists", "exit_code_0"])
+        s.add_argument("--output")
+        s.add_argument("--disabled", action="store_true")
+        s.set_defaults(fn=cmd_add)
+
+    if want("run-task"):
+        s = sub.add_parser("run-task")
+        s.add_argument("--id", required=True)
+        s.set_defaults(fn=cmd_run_task)
+
+    if want("run-due"):
+        s = sub.add_parser("run-due")
+        s.add_argument("--limit", type=int, default=25)
+        s.add_argument("--marker", help="Run only tasks in this active marker")
+        s.add_argument("--active-markers-only", action="store_true", help="Run only tasks belonging to any active marker")
+        s.set_defaults(fn=cmd_run_due)
+
+    if want("runs"):
+        s = sub.add_parser("runs")
+        s.add_argument("--limit", type=int, default=50)
+        s.set_defaults(fn=cmd_runs)
+
+    if want("report"):
+        s = sub.add_parser("report")
+        s.add_argument("--window", default="24h")
+        s.set_defaults(fn=cmd_report)
+
+    if not want("marker"):
+        return p
 
-    mcl = ms.add_parser("close")
-    mcl.add_argument("--name", required=True)
-    mcl.set_defaults(fn=cmd_marker_close)
+    m = sub.add_parser("marker", help="marker operations")
+    ms = m.add_subparsers(dest="marker_cmd", required=True)
+
+    if want_marker("create"):
+        mc = ms.add_parser("create")
+        mc.add_argument("--name", required=True)
+        mc.set_defaults(fn=cmd_marker_create)
+
+    if want_marker("list"):
+        ml = ms.add_parser("list")
+        ml.add_argument("--limit", type=int, default=50)
+        ml.set_defaults(fn=cmd_marker_list)
+
+    if want_marker("add-task"):
+        ma = ms.add_parser("add-task")
+        ma.add_argument("--name", required=True)
+        ma.add_argument("--task-id", required=True)
+        ma.set_defaults(fn=cmd_marker_add_task)
+
+    if want_marker("status"):
+        mst = ms.add_parser("status")
+        mst.add_argument("--name", required=True)
+        mst.set_defaults(fn=cmd_marker_status)
+
+    if want_marker("reset"):
+        mrst = ms.add_parser("reset")
+        mrst.add_argument("--name", required=True)
+        mrst.set_defaults(fn=cmd_marker_reset)
+
+    if want_marker("close"):
+        mcl = ms.add_parser("close")
+        mcl.add_argument("--name", required=True)
+        mcl.set_defaults(fn=cmd_marker_close)
 
     return p
 
 
+def _parse_args(argv: list[str], only: str | None, marker_only: str | None) -> argparse.Namespace:
+    if only is None:
+        return build_parser().parse_args(argv)
+    try:
+        # The narrowed parser's usage would list only one command, so keep
+        # its error quiet and let the full parser report it instead.
+        with contextlib.redirect_stderr(io.StringIO()):
+            return build_parser(only=only, marker_only=marker_only).parse_args(argv)
+    except SystemExit as e:
+        if not e.code:
+            raise
+    return build_parser().parse_args(argv)
+
+
 def main(argv=None) -> int:
     argv = argv if argv is not None else sys.argv[1:]
-    args = build_parser().parse_args(argv)
+    # Answer --version before building the parser or importing any command deps.
+    if argv[:1] in (["-V"], ["--version"]):
+        print(f"tg {__version__}")
+        return 0
+    # Only build the subparser being invoked; unknown commands and top-level
+    # --help fall back to the full parser so usage/errors list every choice.
+    only = _sniff_subcommand(argv, _COMMANDS)
+    marker_only = None
+    if only == "marker":
+        marker_only = _sniff_subcommand(argv[argv.index("marker") + 1:], _MARKER_COMMANDS)
+    args = _parse_args(argv, only, marker_only)
     return int(args.fn(args))
 
 
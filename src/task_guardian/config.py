@@ -1,28 +1,34 @@
 from __future__ import annotations
 import os
-from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
+from typing import NamedTuple, Optional
 
-@dataclass(frozen=True)
-class TGConfig:
+class TGConfig(NamedTuple):
     data_dir: Path
     log_dir: Path
     db_path: Path
 
+def _path(p: str) -> Path:
+    return Path(p).expanduser() if p.startswith("~") else Path(p)
+
 def load_config() -> TGConfig:
-    cwd = Path.cwd()
-    default_data = cwd / "data"
-    default_logs = cwd / "logs"
-
-    data_dir = Path(os.getenv(
-        "TG_DATA_DIR",
-        str(default_data if default_data.exists() else Path.home() / ".task-guardian" / "data")
-    )).expanduser()
-
-    log_dir = Path(os.getenv(
-        "TG_LOG_DIR",
-        str(default_logs if default_logs.exists() else Path.home() / ".task-guardian" / "logs")
-    )).expanduser()
+    # Memoized per (cwd, home, env) so repeated calls in one process skip the
+    # filesystem probes and mkdirs.
+    return _load_config_impl(str(Path.cwd()), str(Path.home()), os.getenv("TG_DATA_DIR"), os.getenv("TG_LOG_DIR"))
+
+@lru_cache(maxsize=4)
+def _load_config_impl(cwd: str, home: str, data_env: Optional[str], log_env: Optional[str]) -> TGConfig:
+    default_data = Path(cwd) / "data"
+    default_logs = Path(cwd) / "logs"
+
+    if data_env is None:
+        data_env = str(default_data if default_data.exists() else Path(home) / ".task-guardian" / "data")
+    data_dir = _path(data_env)
+
+    if log_env is None:
+        log_env = str(default_logs if default_logs.exists() else Path(home) / ".task-guardian" / "logs")
+    log_dir = _path(log_env)
 
     data_dir.mkdir(parents=True, exist_ok=True)
     log_dir.mkdir(parents=True, exist_ok=True)
@@ -1,11 +1,18 @@
 from __future__ import annotations
+import os
+import shlex
+import signal
 import subprocess
-import uuid
+import tempfile
 from dataclasses import dataclass
-from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Callable
 from .logging_utils import log_line
+from .timeutil import utc_now_iso as now_iso
+
+# Max bytes of a command's stderr appended to its output file.
+_STDERR_CAP = 1 << 20
 
 @dataclass
 class ExecResult:
@@ -17,33 +24,71 @@ def _write_output(path: Path, text: str) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     path.write_text(text, encoding="utf-8")
 
+def _non_empty(path: Path) -> bool:
+    # One stat() instead of exists() + stat().
+    try:
+        return os.stat(path).st_size > 0
+    except OSError:
+        return False
+
 def verify_file_exists(output_path: Path) -> tuple[bool, str]:
-    ok = output_path.exists() and output_path.stat().st_size > 0
+    ok = _non_empty(output_path)
     return ok, f"Output file {'exists' if ok else 'missing'}: {output_path}"
 
 def verify_exit_code_0(output_path: Path) -> tuple[bool, str]:
-    ok = output_path.exists() and output_path.stat().st_size > 0
+    ok = _non_empty(output_path)
     return ok, f"Exit code verification: {'passed' if ok else 'failed'}"
 
+_VERIFIERS: dict[str, Callable[[Path], tuple[bool, str]]] = {
+    "file_exists": verify_file_exists,
+    "exit_code_0": verify_exit_code_0,
+}
+
+@lru_cache(maxsize=8)
 def verifier(name: str) -> Callable[[Path], tuple[bool, str]]:
     name = (name or "file_exists").strip().lower()
-    if name == "file_exists":
-        return verify_file_exists
-    if name == "exit_code_0":
-        return verify_exit_code_0
+    v = _VERIFIERS.get(name)
+    if v is not None:
+        return v
     return lambda p: (False, f"Unknown verify type: {name}")
 
 def new_run_id() -> str:
-    return uuid.uuid4().hex
-
-def now_iso() -> str:
-    return datetime.now(timezone.utc).isoformat()
-
-def run_subprocess_and_capture(*, cmd: str, timeout: int, log_file: Path) -> tuple[bool, str, dict]:
-    log_line(log_file, f"  run: {cmd[:140]}")
-    r = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=timeout)
-    text = (r.stdout or "")
-    if r.stderr:
-        text += "\n--- STDERR ---\n" + r.stderr
-    ok = (r.returncode == 0)
-    return ok, text, {"returncode": r.returncode, "stdout_len": len(r.stdout or ""), "stderr_len": len(r.stderr or "")}
+    # Same 32-hex-char shape as uuid4().hex without building a UUID object.
+    return os.urandom(16).hex()
+
+def run_subprocess_and_capture(*, cmd: str | list[str], timeout: int, log_file: Path, output_path: Path) -> tuple[bool, dict]:
+    """
+    Runs cmd with stdout redirected straight into output_path, so large outputs
+    never pass through Python. Stderr (capped) is appended after a marker line.
+    A string cmd goes through the shell; an argv list is executed directly.
+    """
+    shell = isinstance(cmd, str)
+    log_line(log_file, f"  run: {(cmd if shell else shlex.join(cmd))[:140]}")
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with output_path.open("wb") as fh, tempfile.TemporaryFile() as ef:
+        try:
+            # Own session, so a timeout can kill the shell and everything it started.
+            # Stderr goes to a temp file so only _STDERR_CAP bytes of it are ever read.
+            with subprocess.Popen(cmd, shell=shell, stdout=fh, stderr=ef, start_new_session=True) as p:
+                try:
+                    returncode = p.wait(timeout=timeout)
+                except BaseException:
+                    # Timeout, KeyboardInterrupt, ...: don't leave the group running.
+                    try:
+                        os.killpg(p.pid, signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
+                    p.wait()
+                    raise
+        except FileNotFoundError as e:
+            # Report a missing program the way the shell would: exit 127.
+            returncode = 127
+            ef.write(str(e).encode())
+            ef.flush()
+        stdout_len = os.fstat(fh.fileno()).st_size
+        stderr_len = os.fstat(ef.fileno()).st_size
+        if stderr_len:
+            ef.seek(0)
+            fh.write(b"\n--- STDERR ---\n" + ef.read(_STDERR_CAP))
+    ok = (returncode == 0)
+    return ok, {"returncode": returncode, "stdout_len": stdout_len, "stderr_len": stderr_len}
@@ -1,6 +1,19 @@
 from __future__ import annotations
+import sys
 from typing import Any, Callable, Dict, Tuple
 
+def prewarm() -> None:
+    """
+    Imports executive_guardian ahead of the first guarded task so that call
+    doesn't pay for it. Safe to run from a background thread.
+    """
+    if "executive_guardian.guardian" in sys.modules:
+        return
+    try:
+        from executive_guardian import guardian  # type: ignore  # noqa: F401
+    except Exception:
+        pass
+
 def exec_with_guard_if_available(
     *, task_id: str, lane: str, action_type: str,
     expected_outcome: str, confidence_pre: float,
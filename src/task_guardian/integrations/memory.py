@@ -1,7 +1,12 @@
 from __future__ import annotations
 
 import os
-from typing import Optional
+from typing import Any, Optional
+
+# Import discovery and clients are resolved once per process.
+_MEMORY_CLASSES: tuple | None = None
+_MEMORY_UNAVAILABLE = False
+_CLIENTS: dict[str, Any] = {}
 
 def _load_memory():
     """
@@ -9,18 +14,46 @@ def _load_memory():
       - memory_os.*     (older / alternate)
       - memory_guardian.* (current repo layout)
     """
+    global _MEMORY_CLASSES, _MEMORY_UNAVAILABLE
+    if _MEMORY_CLASSES is not None:
+        return _MEMORY_CLASSES
+    if _MEMORY_UNAVAILABLE:
+        raise ImportError("memory_os / memory_guardian not available")
+
     # Try memory_os first
     try:
         from memory_os.api import MemoryGuardian  # type: ignore
         from memory_os.config import Config  # type: ignore
-        return MemoryGuardian, Config
+        _MEMORY_CLASSES = (MemoryGuardian, Config)
+        return _MEMORY_CLASSES
     except Exception:
         pass
 
     # Try memory_guardian
-    from memory_guardian.api import MemoryGuardian  # type: ignore
-    from memory_guardian.config import Config  # type: ignore
-    return MemoryGuardian, Config
+    try:
+        from memory_guardian.api import MemoryGuardian  # type: ignore
+        from memory_guardian.config import Config  # type: ignore
+    except Exception:
+        _MEMORY_UNAVAILABLE = True
+        raise
+    _MEMORY_CLASSES = (MemoryGuardian, Config)
+    return _MEMORY_CLASSES
+
+def prewarm() -> None:
+    """Resolves the memory backend ahead of the first task. Safe to run from a background thread."""
+    if _MEMORY_CLASSES is not None or _MEMORY_UNAVAILABLE:
+        return
+    try:
+        _load_memory()
+    except Exception:
+        pass
+
+def _client(data_dir: str):
+    mem = _CLIENTS.get(data_dir)
+    if mem is None:
+        MemoryGuardian, Config = _load_memory()
+        mem = _CLIENTS[data_dir] = MemoryGuardian(Config(data_dir=data_dir))
+    return mem
 
 def remember_if_available(*, session_id: str, role: str, content: str, data_dir: Optional[str] = None) -> bool:
     """
@@ -32,10 +65,8 @@ def remember_if_available(*, session_id: str, role: str, content: str, data_dir:
       3) ./data
     """
     try:
-        MemoryGuardian, Config = _load_memory()
         chosen = os.getenv("TG_MEMORY_DIR") or data_dir or "./data"
-        mem = MemoryGuardian(Config(data_dir=chosen))
-        mem.remember_message(role=role, content=content, session_id=session_id)
+        _client(chosen).remember_message(role=role, content=content, session_id=session_id)
         return True
     except Exception:
         return False
@@ -1,11 +1,77 @@
 from __future__ import annotations
-from datetime import datetime, timezone
+import atexit
+import sys
+import threading
+import time
 from pathlib import Path
+from typing import TextIO
+
+class _LoggerCache:
+    """Line-buffered append handles, opened once per log file for the life of the process."""
+
+    def __init__(self) -> None:
+        self._files: dict[Path, TextIO] = {}
+        self._lock = threading.Lock()
+
+    def get(self, log_file: Path) -> TextIO:
+        f = self._files.get(log_file)
+        if f is None:
+            with self._lock:
+                f = self._files.get(log_file)
+                if f is None:
+                    log_file.parent.mkdir(parents=True, exist_ok=True)
+                    f = self._files[log_file] = open(log_file, "a", encoding="utf-8", buffering=1)
+        return f
+
+    def close_all(self) -> None:
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+
+_LOGS = _LoggerCache()
+atexit.register(_LOGS.close_all)
+
+class LogBuffer:
+    """
+    While active, log_line() still prints right away but holds its file
+    writes; they go out as one write per log file when the block exits.
+    """
+
+    def __init__(self) -> None:
+        self._lines: dict[Path, list[str]] = {}
+        self._lock = threading.Lock()
+        self._prev: LogBuffer | None = None
+
+    def __enter__(self) -> LogBuffer:
+        global _BUFFER
+        self._prev, _BUFFER = _BUFFER, self
+        return self
+
+    def __exit__(self, *exc) -> None:
+        global _BUFFER
+        _BUFFER = self._prev
+        self.flush()
+
+    def append(self, log_file: Path, line: str) -> None:
+        with self._lock:
+            self._lines.setdefault(log_file, []).append(line)
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._lines = self._lines, {}
+        for log_file, lines in pending.items():
+            _LOGS.get(log_file).write("\n".join(lines) + "\n")
+
+_BUFFER: LogBuffer | None = None
+# One locked write per line keeps lines from pool threads from interleaving on stdout.
+_STDOUT_LOCK = threading.Lock()
 
 def log_line(log_file: Path, msg: str) -> None:
-    ts = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+    ts = time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime())
     line = f"[{ts}] {msg}"
-    print(line)
-    log_file.parent.mkdir(parents=True, exist_ok=True)
-    with open(log_file, "a", encoding="utf-8") as f:
-        f.write(line + "\n")
+    with _STDOUT_LOCK:
+        sys.stdout.write(line + "\n")
+    if _BUFFER is not None:
+        _BUFFER.append(log_file, line)
+    else:
+        _LOGS.get(log_file).write(line + "\n")
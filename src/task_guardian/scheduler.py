@@ -1,8 +1,25 @@
 from __future__ import annotations
+import copy
 from datetime import datetime, timezone, timedelta
-from typing import Optional
-from croniter import croniter
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional
 
+if TYPE_CHECKING:
+    from croniter import croniter
+
+_UTC = timezone.utc
+_WINDOW_UNITS = {"m": timedelta(minutes=1), "h": timedelta(hours=1), "d": timedelta(days=1)}
+
+# every:<seconds> values seen so far, so bulk scheduling skips re-parsing them.
+_EVERY_SECONDS: dict[str, int] = {}
+
+# (min, max) for minute, hour, day-of-month, month, day-of-week (0 and 7 are Sunday).
+_CRON_BOUNDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+_MONTH_DAYS = (31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+# Give up after this many years without a match and let croniter decide.
+_CRON_MAX_YEARS = 50
+
+@lru_cache(maxsize=256)
 def parse_schedule(schedule: str) -> tuple[str, str]:
     if ":" not in schedule:
         raise ValueError("schedule must be cron:<expr> or every:<seconds>")
@@ -13,20 +30,111 @@ def parse_schedule(schedule: str) -> tuple[str, str]:
         raise ValueError("schedule kind must be cron or every")
     return kind, val
 
+def _parse_cron_field(field: str, lo: int, hi: int) -> frozenset[int]:
+    values: set[int] = set()
+    for part in field.split(","):
+        rng, has_step, step_s = part.partition("/")
+        step = int(step_s) if has_step else 1
+        if rng == "*":
+            start, end = lo, hi
+        elif "-" in rng:
+            a, b = rng.split("-", 1)
+            start, end = int(a), int(b)
+        elif has_step:
+            raise ValueError(f"unsupported cron field: {field}")
+        else:
+            start = end = int(rng)
+        if step < 1 or not (lo <= start <= end <= hi):
+            raise ValueError(f"unsupported cron field: {field}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+class _InlineCron:
+    """
+    Plain 5-field cron expressions (*, lists, a-b ranges, /steps) evaluated
+    without croniter. Anything else (names, L/W/#/?, @aliases, seconds fields)
+    fails to parse and is left to croniter.
+
+    Single-value ranges ("6-6") mean that value here; croniter mishandles
+    some of them (e.g. "* 15 13 10 6-6" fires on non-Saturdays), so results
+    can differ from croniter for such expressions. tests/test_scheduler.py
+    checks everything else against croniter.
+    """
+    __slots__ = ("minutes", "hours", "days", "months", "weekdays", "day_or")
+
+    def __init__(self, expr: str):
+        fields = expr.split()
+        if len(fields) != 5:
+            raise ValueError(f"unsupported cron expression: {expr}")
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            _parse_cron_field(f, lo, hi) for f, (lo, hi) in zip(fields, _CRON_BOUNDS)
+        )
+        self.weekdays = frozenset(d % 7 for d in weekdays)
+        # croniter's day matching is inconsistent for spelled-out full ranges
+        # (*/1, 0-7, 1-31), and it raises for days no selected month has;
+        # leave both to it.
+        if (fields[2] != "*" and len(self.days) == 31) or (fields[4] != "*" and len(self.weekdays) == 7):
+            raise ValueError(f"unsupported cron expression: {expr}")
+        if min(self.days) > max(_MONTH_DAYS[m - 1] for m in self.months):
+            raise ValueError(f"unsupported cron expression: {expr}")
+        # Unless a day field is "*", a day matching either one is enough.
+        self.day_or = fields[2] != "*" and fields[4] != "*"
+
+    def _day_matches(self, t: datetime) -> bool:
+        dom_ok = t.day in self.days
+        dow_ok = (t.weekday() + 1) % 7 in self.weekdays
+        return (dom_ok or dow_ok) if self.day_or else (dom_ok and dow_ok)
+
+    def next_after(self, base: datetime) -> Optional[datetime]:
+        t = base.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        last_year = t.year + _CRON_MAX_YEARS
+        while t.year <= last_year:
+            if t.month not in self.months:
+                t = t.replace(year=t.year + t.month // 12, month=t.month % 12 + 1, day=1, hour=0, minute=0)
+            elif not self._day_matches(t):
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+            elif t.hour not in self.hours:
+                t = t.replace(minute=0) + timedelta(hours=1)
+            elif t.minute not in self.minutes:
+                t += timedelta(minutes=1)
+            else:
+                return t
+        return None
+
+@lru_cache(maxsize=256)
+def _compile_cron(val: str) -> Optional[_InlineCron]:
+    try:
+        return _InlineCron(val)
+    except ValueError:
+        return None
+
+@lru_cache(maxsize=256)
+def _parse_cron_fields(val: str) -> croniter:
+    # Fallback for expressions _InlineCron can't handle. Expanding the
+    # expression is the expensive part of croniter(); do it once per
+    # expression and hand out shallow copies rebased via set_current().
+    from croniter import croniter
+    return croniter(val, datetime(1970, 1, 1, tzinfo=_UTC))
+
 def next_run_iso(schedule: str, *, base: Optional[datetime] = None) -> str:
-    base = base or datetime.now(timezone.utc)
+    base = base or datetime.now(_UTC)
     kind, val = parse_schedule(schedule)
     if kind == "every":
-        return (base + timedelta(seconds=int(val))).isoformat()
-    it = croniter(val, base)
-    return it.get_next(datetime).replace(tzinfo=timezone.utc).isoformat()
-
-def utc_now_iso() -> str:
-    return datetime.now(timezone.utc).isoformat()
+        seconds = _EVERY_SECONDS.get(val)
+        if seconds is None:
+            seconds = _EVERY_SECONDS[val] = int(val)
+        return (base + timedelta(seconds=seconds)).isoformat()
+    cron = _compile_cron(val) if base.tzinfo in (None, _UTC) else None
+    nxt = cron.next_after(base) if cron else None
+    if nxt is not None:
+        return nxt.replace(tzinfo=_UTC).isoformat()
+    it = copy.copy(_parse_cron_fields(val))
+    it.set_current(base, force=True)
+    return it.get_next(datetime).replace(tzinfo=_UTC).isoformat()
 
 def parse_window(window: str) -> timedelta:
     w = window.strip().lower()
-    if w.endswith("h"): return timedelta(hours=int(w[:-1]))
-    if w.endswith("d"): return timedelta(days=int(w[:-1]))
-    if w.endswith("m"): return timedelta(minutes=int(w[:-1]))
-    raise ValueError("window must end with m/h/d (e.g. 90m, 24h, 7d)")
+    unit = _WINDOW_UNITS.get(w[-1:])
+    if unit is None:
+        raise ValueError("window must end with m/h/d (e.g. 90m, 24h, 7d)")
+    return unit * int(w[:-1])
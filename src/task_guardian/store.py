@@ -1,16 +1,13 @@
 from __future__ import annotations
-import json
 import sqlite3
-from dataclasses import dataclass
-from datetime import datetime, timezone
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Optional, Sequence
+from typing import Any, Iterable, Iterator, NamedTuple, Optional, Sequence
+from . import _json
+from .timeutil import utc_now_iso
 
-def utc_now_iso() -> str:
-    return datetime.now(timezone.utc).isoformat()
-
-@dataclass
-class Task:
+class Task(NamedTuple):
     id: str
     name: str
     tool: str
@@ -24,8 +21,7 @@ class Task:
     updated_at: str
     next_run_at: Optional[str]
 
-@dataclass
-class RunRecord:
+class RunRecord(NamedTuple):
     run_id: str
     task_id: str
     status: str
@@ -64,7 +60,9 @@ CREATE TABLE IF NOT EXISTS runs (
 );
 
 CREATE INDEX IF NOT EXISTS idx_runs_task_id_started_at ON runs(task_id, started_at);
+CREATE INDEX IF NOT EXISTS idx_runs_started_at_status ON runs(started_at, status);
 CREATE INDEX IF NOT EXISTS idx_tasks_next_run_at ON tasks(next_run_at);
+-- Due-task lookups use idx_tasks_effective_next, created in MIGRATIONS.
 
 CREATE TABLE IF NOT EXISTS markers (
   marker_id TEXT PRIMARY KEY,
@@ -88,133 +86,399 @@ CREATE INDEX IF NOT EXISTS idx_marker_tasks_task ON marker_tasks(task_id);
 
 """
 
+# Applied in order on top of SCHEMA; PRAGMA user_version records how many have run.
+MIGRATIONS = (
+    # Due tasks are ordered by COALESCE(next_run_at, created_at); as a generated
+    # column with its own index a tick walks the index in order instead of sorting.
+    r"""
+    ALTER TABLE tasks ADD COLUMN effective_next_run_at TEXT
+      GENERATED ALWAYS AS (COALESCE(next_run_at, created_at)) VIRTUAL;
+    CREATE INDEX idx_tasks_effective_next ON tasks(enabled, effective_next_run_at);
+    """,
+    # Tasks in at least one active marker, kept current by triggers so
+    # run-due --active-markers-only reads one table instead of a 3-way join.
+    r"""
+    CREATE TABLE active_marker_tasks (task_id TEXT PRIMARY KEY) WITHOUT ROWID;
+    INSERT OR IGNORE INTO active_marker_tasks (task_id)
+      SELECT mt.task_id FROM marker_tasks mt
+      JOIN markers m ON m.marker_id = mt.marker_id
+      WHERE m.status='active';
+
+    CREATE TRIGGER trg_marker_tasks_insert AFTER INSERT ON marker_tasks
+    BEGIN
+      INSERT OR IGNORE INTO active_marker_tasks (task_id)
+        SELECT NEW.task_id WHERE EXISTS (
+          SELECT 1 FROM markers WHERE marker_id = NEW.marker_id AND status='active');
+    END;
+
+    CREATE TRIGGER trg_marker_tasks_delete AFTER DELETE ON marker_tasks
+    BEGIN
+      DELETE FROM active_marker_tasks
+      WHERE task_id = OLD.task_id AND NOT EXISTS (
+        SELECT 1 FROM marker_tasks mt JOIN markers m ON m.marker_id = mt.marker_id
+        WHERE mt.task_id = OLD.task_id AND m.status='active');
+    END;
+
+    CREATE TRIGGER trg_markers_status AFTER UPDATE OF status ON markers
+    BEGIN
+      DELETE FROM active_marker_tasks
+      WHERE task_id IN (SELECT task_id FROM marker_tasks WHERE marker_id = NEW.marker_id)
+        AND NOT EXISTS (
+          SELECT 1 FROM marker_tasks mt JOIN markers m ON m.marker_id = mt.marker_id
+          WHERE mt.task_id = active_marker_tasks.task_id AND m.status='active');
+      INSERT OR IGNORE INTO active_marker_tasks (task_id)
+        SELECT task_id FROM marker_tasks WHERE marker_id = NEW.marker_id AND NEW.status='active';
+    END;
+
+    CREATE TRIGGER trg_markers_delete AFTER DELETE ON markers
+    BEGIN
+      DELETE FROM active_marker_tasks
+      WHERE task_id IN (SELECT task_id FROM marker_tasks WHERE marker_id = OLD.marker_id)
+        AND NOT EXISTS (
+          SELECT 1 FROM marker_tasks mt JOIN markers m ON m.marker_id = mt.marker_id
+          WHERE mt.task_id = active_marker_tasks.task_id AND m.status='active');
+    END;
+    """,
+    # Per-database settings; see _META_FORMAT_KEY.
+    r"""
+    CREATE TABLE settings (key TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID;
+    """,
+)
+
+# WAL lets readers run alongside the writer, and with synchronous=NORMAL commits
+# no longer fsync individually (only checkpoints do). The rest are per-connection caches.
+PRAGMAS = r"""
+PRAGMA journal_mode=WAL;
+PRAGMA synchronous=NORMAL;
+PRAGMA wal_autocheckpoint=1000;
+PRAGMA mmap_size=268435456;
+PRAGMA cache_size=-20000;
+PRAGMA temp_store=MEMORY;
+PRAGMA cache_spill=0;
+"""
+
+# runs.meta_json is stored either as JSON text or, when the database was first
+# opened by SQLite 3.45+, as JSONB, so json_patch works on the stored binary form
+# instead of re-parsing text. The choice is recorded in the settings table and
+# every later open uses the matching statements (json() reads JSONB back as text).
+_META_FORMAT_KEY = "runs.meta_format"
+_HAS_JSONB = sqlite3.sqlite_version_info >= (3, 45, 0)
+
+# Column lists in Task / RunRecord field order, so rows map onto them positionally.
+_TASK_COLUMNS = "id,name,tool,params_json,schedule,expected,verify,output_path,enabled,created_at,updated_at,next_run_at"
+_T_TASK_COLUMNS = ",".join("t." + col for col in _TASK_COLUMNS.split(","))
+_MARKER_COLUMNS = "marker_id,name,status,created_at,closed_at"
+# Rows per page when streaming results (iter_runs).
+_ITER_CHUNK = 256
+
+# Hot-path statements, kept as constants so each one maps to a single entry
+# in the connection's prepared-statement cache.
+_SQL_UPSERT_TASK = """
+INSERT INTO tasks (id,name,tool,params_json,schedule,expected,verify,output_path,enabled,created_at,updated_at,next_run_at)
+VALUES (?,?,?,?,?,?,?,?,?,?,?,?)
+ON CONFLICT(id) DO UPDATE SET
+  name=excluded.name,
+  tool=excluded.tool,
+  params_json=excluded.params_json,
+  schedule=excluded.schedule,
+  expected=excluded.expected,
+  verify=excluded.verify,
+  output_path=excluded.output_path,
+  enabled=excluded.enabled,
+  updated_at=excluded.updated_at,
+  next_run_at=excluded.next_run_at
+"""
+
+class _RunSQL(NamedTuple):
+    columns: str
+    insert: str
+    finish: str
+
+def _run_sql(meta_in: str, meta_patch: str, meta_out: str) -> _RunSQL:
+    return _RunSQL(
+        columns=f"run_id,task_id,status,started_at,finished_at,message,output_path,{meta_out}",
+        insert=(
+            "INSERT INTO runs (run_id,task_id,status,started_at,finished_at,message,output_path,meta_json) "
+            f"VALUES (?,?,?,?,?,?,?,{meta_in})"
+        ),
+        # Merge in SQL with json_patch (RFC 7396: a null value removes that key).
+        finish=f"UPDATE runs SET status=?, message=?, finished_at=?, meta_json={meta_patch}(meta_json, ?) WHERE run_id=?",
+    )
+
+_RUN_SQL = {
+    "text": _run_sql("?", "json_patch", "meta_json"),
+    "jsonb": _run_sql("jsonb(?)", "jsonb_patch", "json(meta_json)"),
+}
+
+_SQL_MARKER_LATEST = """
+WITH latest AS (
+  SELECT r.task_id, r.status, r.started_at, r.message,
+         ROW_NUMBER() OVER (PARTITION BY r.task_id ORDER BY r.started_at DESC) AS rn
+  FROM runs r
+  JOIN marker_tasks mt ON mt.task_id = r.task_id
+  WHERE mt.marker_id = ? AND r.started_at >= ?
+)
+SELECT mt.task_id, l.status, l.started_at, l.message
+FROM marker_tasks mt
+LEFT JOIN latest l ON l.task_id = mt.task_id AND l.rn = 1
+WHERE mt.marker_id = ?
+ORDER BY mt.added_at ASC
+"""
+
+_SQL_DUE = f"""
+SELECT {_TASK_COLUMNS} FROM tasks
+WHERE enabled=1
+  AND (next_run_at IS NULL OR next_run_at <= ?)
+ORDER BY effective_next_run_at ASC
+LIMIT ?
+"""
+
+_SQL_DUE_MARKER = f"""
+SELECT {_T_TASK_COLUMNS} FROM tasks t
+JOIN marker_tasks mt ON mt.task_id = t.id
+WHERE mt.marker_id = ?
+  AND t.enabled=1
+  AND (t.next_run_at IS NULL OR t.next_run_at <= ?)
+ORDER BY t.effective_next_run_at ASC
+LIMIT ?
+"""
+
+_SQL_DUE_ACTIVE_MARKERS = f"""
+SELECT {_T_TASK_COLUMNS} FROM active_marker_tasks a
+JOIN tasks t ON t.id = a.task_id
+WHERE t.enabled=1
+  AND (t.next_run_at IS NULL OR t.next_run_at <= ?)
+ORDER BY t.effective_next_run_at ASC
+LIMIT ?
+"""
+
+def _dict_factory(cur: sqlite3.Cursor, row: tuple) -> dict[str, Any]:
+    return dict(zip([d[0] for d in cur.description], row))
+
 class TaskStore:
     def __init__(self, db_path: Path):
         self.db_path = db_path
+        # One connection for the life of the store, shared across threads;
+        # _lock serializes every use of it.
+        self._lock = threading.RLock()
+        self._tx_depth = 0
+        self._c = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=30, cached_statements=256)
+        self._c.row_factory = sqlite3.Row
         self._init()
 
-    def _conn(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+    def close(self) -> None:
+        with self._lock:
+            self._c.close()
+
+    @contextmanager
+    def _rows(self) -> Iterator[sqlite3.Cursor]:
+        # Plain-tuple cursor for queries whose rows are built positionally
+        # into Task / RunRecord, skipping the sqlite3.Row wrapper.
+        with self._lock:
+            cur = self._c.cursor()
+            cur.row_factory = None
+            yield cur
+
+    @contextmanager
+    def _dicts(self) -> Iterator[sqlite3.Cursor]:
+        # Cursor yielding plain dicts, for rows that are returned as-is.
+        with self._lock:
+            cur = self._c.cursor()
+            cur.row_factory = _dict_factory
+            yield cur
+
+    @contextmanager
+    def _read(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            yield self._c
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Runs the block in one BEGIN IMMEDIATE ... COMMIT (ROLLBACK on error).
+        Store writes made inside it, and nested transaction() blocks, join it.
+        """
+        with self._lock:
+            if self._tx_depth:
+                self._tx_depth += 1
+                try:
+                    yield self._c
+                finally:
+                    self._tx_depth -= 1
+                return
+            self._c.execute("BEGIN IMMEDIATE")
+            self._tx_depth = 1
+            try:
+                yield self._c
+            except BaseException:
+                self._c.execute("ROLLBACK")
+                raise
+            else:
+                self._c.execute("COMMIT")
+            finally:
+                self._tx_depth = 0
 
     def _init(self) -> None:
-        with self._conn() as c:
-            c.executescript(SCHEMA)
+        with self._lock:
+            self._c.executescript(SCHEMA)
+            self._migrate()
+            self._run = _RUN_SQL[self._meta_format()]
+            self._c.executescript(PRAGMAS)
+
+    def _migrate(self) -> None:
+        if self._c.execute("PRAGMA user_version").fetchone()[0] >= len(MIGRATIONS):
+            return
+        with self.transaction() as c:
+            # Re-read under the write lock in case another process got here first.
+            version = c.execute("PRAGMA user_version").fetchone()[0]
+            for i, script in enumerate(MIGRATIONS[version:], start=version + 1):
+                # executescript() would COMMIT first, so run it statement by
+                # statement; trigger bodies contain ';' too, hence complete_statement().
+                stmt = ""
+                for part in script.split(";"):
+                    stmt += part + ";"
+                    if sqlite3.complete_statement(stmt):
+                        if stmt.strip(" \n;"):
+                            c.execute(stmt)
+                        stmt = ""
+                c.execute(f"PRAGMA user_version={i}")
+
+    def _meta_format(self) -> str:
+        q = "SELECT value FROM settings WHERE key=?"
+        row = self._c.execute(q, (_META_FORMAT_KEY,)).fetchone()
+        if row is None:
+            # First open decides; another process may have got there first.
+            with self.transaction() as c:
+                c.execute(
+                    "INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)",
+                    (_META_FORMAT_KEY, "jsonb" if _HAS_JSONB else "text"),
+                )
+                row = c.execute(q, (_META_FORMAT_KEY,)).fetchone()
+        fmt = row[0]
+        if fmt == "jsonb" and not _HAS_JSONB:
+            raise RuntimeError(
+                f"{self.db_path} stores run meta as JSONB, which needs SQLite 3.45+ (have {sqlite3.sqlite_version})"
+            )
+        return fmt
 
     def upsert_task(
         self, *, task_id: str, name: str, tool: str, params: dict[str, Any],
         schedule: str, expected: str, verify: str, output_path: str,
         enabled: bool = True, next_run_at: Optional[str] = None
     ) -> None:
+        self.upsert_tasks_bulk([dict(
+            task_id=task_id, name=name, tool=tool, params=params, schedule=schedule, expected=expected,
+            verify=verify, output_path=output_path, enabled=enabled, next_run_at=next_run_at,
+        )])
+
+    def upsert_tasks_bulk(self, rows: Iterable[dict[str, Any]]) -> None:
+        """Upsert many tasks (dicts of upsert_task kwargs) in a single transaction."""
         now = utc_now_iso()
-        with self._conn() as c:
-            c.execute(
-                """
-                INSERT INTO tasks (id,name,tool,params_json,schedule,expected,verify,output_path,enabled,created_at,updated_at,next_run_at)
-                VALUES (?,?,?,?,?,?,?,?,?,?,?,?)
-                ON CONFLICT(id) DO UPDATE SET
-                  name=excluded.name,
-                  tool=excluded.tool,
-                  params_json=excluded.params_json,
-                  schedule=excluded.schedule,
-                  expected=excluded.expected,
-                  verify=excluded.verify,
-                  output_path=excluded.output_path,
-                  enabled=excluded.enabled,
-                  updated_at=excluded.updated_at,
-                  next_run_at=excluded.next_run_at
-                """,
-                (task_id, name, tool, json.dumps(params, ensure_ascii=False), schedule, expected, verify,
-                 output_path, 1 if enabled else 0, now, now, next_run_at)
-            )
+        values = [
+            (r["task_id"], r["name"], r["tool"], _json.dumps(r["params"]), r["schedule"],
+             r["expected"], r["verify"], r["output_path"], 1 if r.get("enabled", True) else 0, now, now,
+             r.get("next_run_at"))
+            for r in rows
+        ]
+        with self.transaction() as c:
+            c.executemany(_SQL_UPSERT_TASK, values)
 
     def list_tasks(self, *, enabled_only: bool = False, limit: int = 50) -> list[Task]:
-        q = "SELECT * FROM tasks "
+        q = f"SELECT {_TASK_COLUMNS} FROM tasks "
         params: Sequence[Any] = ()
         if enabled_only:
             q += "WHERE enabled=1 "
         q += "ORDER BY updated_at DESC LIMIT ?"
         params = (*params, limit)
-        with self._conn() as c:
-            rows = c.execute(q, params).fetchall()
-            return [Task(**dict(r)) for r in rows]
+        with self._rows() as cur:
+            return [Task(*r) for r in cur.execute(q, params)]
 
     def due_tasks(self, *, now_iso: str, limit: int = 25) -> list[Task]:
-        with self._conn() as c:
-            rows = c.execute(
-                """
-                SELECT * FROM tasks
-                WHERE enabled=1
-                  AND (next_run_at IS NULL OR next_run_at <= ?)
-                ORDER BY COALESCE(next_run_at, created_at) ASC
-                LIMIT ?
-                """,
-                (now_iso, limit),
-            ).fetchall()
-            return [Task(**dict(r)) for r in rows]
+        with self._rows() as cur:
+            return [Task(*r) for r in cur.execute(_SQL_DUE, (now_iso, limit))]
 
     def set_next_run(self, task_id: str, next_run_at: Optional[str]) -> None:
         now = utc_now_iso()
-        with self._conn() as c:
+        with self.transaction() as c:
             c.execute("UPDATE tasks SET next_run_at=?, updated_at=? WHERE id=?", (next_run_at, now, task_id))
 
     def set_enabled(self, task_id: str, enabled: bool) -> None:
         now = utc_now_iso()
-        with self._conn() as c:
+        with self.transaction() as c:
             c.execute("UPDATE tasks SET enabled=?, updated_at=? WHERE id=?", (1 if enabled else 0, now, task_id))
 
     def create_run(self, *, run_id: str, task_id: str, started_at: str, output_path: str, meta: dict[str, Any]) -> None:
-        with self._conn() as c:
+        with self.transaction() as c:
             c.execute(
-                "INSERT INTO runs (run_id,task_id,status,started_at,finished_at,message,output_path,meta_json) VALUES (?,?,?,?,?,?,?,?)",
-                (run_id, task_id, "running", started_at, None, "", output_path, json.dumps(meta, ensure_ascii=False)),
+                self._run.insert,
+                (run_id, task_id, "running", started_at, None, "", output_path, _json.dumps(meta)),
             )
 
     def finish_run(self, *, run_id: str, status: str, message: str, finished_at: str, meta_updates: dict[str, Any] | None = None) -> None:
-        with self._conn() as c:
-            row = c.execute("SELECT meta_json FROM runs WHERE run_id=?", (run_id,)).fetchone()
-            meta = json.loads(row["meta_json"]) if row else {}
-            if meta_updates:
-                meta.update(meta_updates)
+        with self.transaction() as c:
             c.execute(
-                "UPDATE runs SET status=?, message=?, finished_at=?, meta_json=? WHERE run_id=?",
-                (status, message, finished_at, json.dumps(meta, ensure_ascii=False), run_id),
+                self._run.finish,
+                (status, message, finished_at, _json.dumps(meta_updates or {}), run_id),
             )
 
     def list_runs(self, *, limit: int = 50) -> list[RunRecord]:
-        with self._conn() as c:
-            rows = c.execute("SELECT * FROM runs ORDER BY started_at DESC LIMIT ?", (limit,)).fetchall()
-            return [RunRecord(**dict(r)) for r in rows]
+        return list(self.iter_runs(limit=limit))
+
+    def iter_runs(self, *, limit: int = 50) -> Iterator[RunRecord]:
+        # Paged by (started_at, run_id), each page fetched in full under the lock,
+        # so no statement or read snapshot stays open between yields. A negative
+        # limit means no limit, as with SQL's LIMIT.
+        first = f"SELECT {self._run.columns} FROM runs ORDER BY started_at DESC, run_id DESC LIMIT ?"
+        after = (
+            f"SELECT {self._run.columns} FROM runs WHERE (started_at, run_id) < (?, ?) "
+            "ORDER BY started_at DESC, run_id DESC LIMIT ?"
+        )
+        q, args = first, ()
+        while limit:
+            n = _ITER_CHUNK if limit < 0 else min(limit, _ITER_CHUNK)
+            with self._rows() as cur:
+                rows = cur.execute(q, (*args, n)).fetchall()
+            for r in rows:
+                yield RunRecord(*r)
+            if len(rows) < n:
+                return
+            if limit > 0:
+                limit -= n
+            q, args = after, (rows[-1][3], rows[-1][0])
 
     def runs_in_window(self, *, since_iso: str) -> list[RunRecord]:
-        with self._conn() as c:
-            rows = c.execute("SELECT * FROM runs WHERE started_at >= ? ORDER BY started_at DESC", (since_iso,)).fetchall()
-            return [RunRecord(**dict(r)) for r in rows]
+        with self._rows() as cur:
+            q = f"SELECT {self._run.columns} FROM runs WHERE started_at >= ? ORDER BY started_at DESC"
+            return [RunRecord(*r) for r in cur.execute(q, (since_iso,))]
+
+    def count_runs_by_status(self, *, since_iso: str) -> dict[str, int]:
+        with self._read() as c:
+            rows = c.execute(
+                "SELECT status, COUNT(*) FROM runs WHERE started_at >= ? GROUP BY status", (since_iso,)
+            ).fetchall()
+            return {r[0]: r[1] for r in rows}
 
 
     # ---------- markers ----------
     def create_marker(self, *, marker_id: str, name: str) -> None:
         now = utc_now_iso()
-        with self._conn() as c:
+        with self.transaction() as c:
             c.execute(
                 "INSERT INTO markers (marker_id,name,status,created_at,closed_at) VALUES (?,?,?,?,?)",
                 (marker_id, name, "active", now, None),
             )
 
     def get_marker(self, *, name: str):
-        with self._conn() as c:
-            row = c.execute("SELECT * FROM markers WHERE name=?", (name,)).fetchone()
-            return dict(row) if row else None
+        with self._dicts() as cur:
+            return cur.execute(f"SELECT {_MARKER_COLUMNS} FROM markers WHERE name=?", (name,)).fetchone()
 
     def list_markers(self, *, limit: int = 50):
-        with self._conn() as c:
-            rows = c.execute("SELECT * FROM markers ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
-            return [dict(r) for r in rows]
+        with self._dicts() as cur:
+            return cur.execute(f"SELECT {_MARKER_COLUMNS} FROM markers ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
 
     def close_marker(self, *, name: str) -> None:
         now = utc_now_iso()
-        with self._conn() as c:
+        with self.transaction() as c:
             c.execute("UPDATE markers SET status='closed', closed_at=? WHERE name=?", (now, name))
 
     def add_task_to_marker(self, *, marker_name: str, task_id: str) -> None:
@@ -222,7 +486,7 @@ class TaskStore:
         if not m:
             raise ValueError(f"Marker not found: {marker_name}")
         now = utc_now_iso()
-        with self._conn() as c:
+        with self.transaction() as c:
             c.execute(
                 "INSERT OR IGNORE INTO marker_tasks (marker_id,task_id,added_at) VALUES (?,?,?)",
                 (m["marker_id"], task_id, now),
@@ -233,52 +497,31 @@ class TaskStore:
         if not m:
             raise ValueError(f"Marker not found: {marker_name}")
 
-        created_at = m["created_at"]
-
-        # tasks attached to marker
-        with self._conn() as c:
-            task_rows = c.execute(
-                "SELECT task_id FROM marker_tasks WHERE marker_id=? ORDER BY added_at ASC",
-                (m["marker_id"],),
-            ).fetchall()
-            task_ids = [r["task_id"] for r in task_rows]
-
-        # For each task: latest run since marker.created_at
+        # Latest run since marker.created_at for every attached task, in one query.
         ok_all = True
         tasks = []
-        with self._conn() as c:
-            for tid in task_ids:
-                r = c.execute(
-                    """
-                    SELECT * FROM runs
-                    WHERE task_id=? AND started_at >= ?
-                    ORDER BY started_at DESC
-                    LIMIT 1
-                    """,
-                    (tid, created_at),
-                ).fetchone()
-
-                if not r:
-                    ok_all = False
-                    tasks.append({"task_id": tid, "state": "missing"})
-                    continue
-
-                rr = dict(r)
-                state = rr["status"]
-                if state != "success":
-                    ok_all = False
-
-                tasks.append({
-                    "task_id": tid,
-                    "state": state,
-                    "latest": {
-                        "started_at": rr["started_at"],
-                        "status": rr["status"],
-                        "message": rr["message"],
-                    }
-                })
-
-        green = bool(ok_all) if task_ids else False
+        with self._read() as c:
+            rows = c.execute(_SQL_MARKER_LATEST, (m["marker_id"], m["created_at"], m["marker_id"])).fetchall()
+        for tid, status, started_at, message in rows:
+            if status is None:
+                ok_all = False
+                tasks.append({"task_id": tid, "state": "missing"})
+                continue
+
+            if status != "success":
+                ok_all = False
+
+            tasks.append({
+                "task_id": tid,
+                "state": status,
+                "latest": {
+                    "started_at": started_at,
+                    "status": status,
+                    "message": message,
+                }
+            })
+
+        green = bool(ok_all) if tasks else False
         return {"marker": m, "green": green, "tasks": tasks}
 
 
@@ -288,43 +531,18 @@ class TaskStore:
         m = self.get_marker(name=marker_name)
         if not m or m.get("status") != "active":
             return []
-        with self._conn() as c:
-            rows = c.execute(
-                """
-                SELECT t.* FROM tasks t
-                JOIN marker_tasks mt ON mt.task_id = t.id
-                WHERE mt.marker_id = ?
-                  AND t.enabled=1
-                  AND (t.next_run_at IS NULL OR t.next_run_at <= ?)
-                ORDER BY COALESCE(t.next_run_at, t.created_at) ASC
-                LIMIT ?
-                """,
-                (m["marker_id"], now_iso, limit),
-            ).fetchall()
-            return [Task(**dict(r)) for r in rows]
+        with self._rows() as cur:
+            return [Task(*r) for r in cur.execute(_SQL_DUE_MARKER, (m["marker_id"], now_iso, limit))]
 
     def due_tasks_active_markers_only(self, *, now_iso: str, limit: int = 25):
-        with self._conn() as c:
-            rows = c.execute(
-                """
-                SELECT DISTINCT t.* FROM tasks t
-                JOIN marker_tasks mt ON mt.task_id = t.id
-                JOIN markers m ON m.marker_id = mt.marker_id
-                WHERE m.status='active'
-                  AND t.enabled=1
-                  AND (t.next_run_at IS NULL OR t.next_run_at <= ?)
-                ORDER BY COALESCE(t.next_run_at, t.created_at) ASC
-                LIMIT ?
-                """,
-                (now_iso, limit),
-            ).fetchall()
-            return [Task(**dict(r)) for r in rows]
+        with self._rows() as cur:
+            return [Task(*r) for r in cur.execute(_SQL_DUE_ACTIVE_MARKERS, (now_iso, limit))]
 
 
 
     def reset_marker(self, *, name: str) -> None:
         now = utc_now_iso()
-        with self._conn() as c:
+        with self.transaction() as c:
             c.execute(
                 "UPDATE markers SET created_at=?, status='active', closed_at=NULL WHERE name=?",
                 (now, name),
@@ -332,6 +550,6 @@ class TaskStore:
 
 
     def get_task_by_id(self, *, task_id: str):
-        with self._conn() as c:
-            row = c.execute("SELECT * FROM tasks WHERE id=?", (task_id,)).fetchone()
-            return Task(**dict(row)) if row else None
+        with self._rows() as cur:
+            row = cur.execute(f"SELECT {_TASK_COLUMNS} FROM tasks WHERE id=?", (task_id,)).fetchone()
+            return Task(*row) if row else None
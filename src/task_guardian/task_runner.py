@@ -1,26 +1,57 @@
 from __future__ import annotations
-import json
 import os
+import threading
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict, Tuple
+from . import _json
 from .config import TGConfig
 from .executor import verifier, new_run_id, now_iso, _write_output, run_subprocess_and_capture
-from .logging_utils import log_line
-from .scheduler import next_run_iso, utc_now_iso
+from .logging_utils import LogBuffer, log_line
+from .scheduler import next_run_iso
 from .store import TaskStore, Task
+from .timeutil import utc_now_iso
+from .integrations import executive, memory
 from .integrations.executive import exec_with_guard_if_available
 from .integrations.memory import remember_if_available
 
+def _prewarm_integrations() -> None:
+    memory.prewarm()
+    executive.prewarm()
+
+@lru_cache(maxsize=512)
+def _parse_params(raw: str) -> dict[str, Any]:
+    # Keyed on the JSON text itself rather than (id, updated_at): set_next_run
+    # bumps updated_at after every run. The dict is shared, so treat it as read-only.
+    return _json.loads(raw)
+
+def _workers() -> int:
+    # TG_WORKERS sizes run_due's pool; anything unparsable falls back to the default.
+    try:
+        return max(1, int(os.getenv("TG_WORKERS", "8")))
+    except ValueError:
+        return 8
+
+def _remember(cfg: TGConfig, content: str, events: list[str] | None) -> None:
+    # With an events list the caller sends them to memory itself, in one batch.
+    if events is not None:
+        events.append(content)
+    else:
+        remember_if_available(session_id="task_guardian", role="SYSTEM", content=content, data_dir=str(cfg.data_dir))
+
 def _tier(exec_ok: bool, verify_ok: bool) -> tuple[str, dict[str, Any]]:
     if exec_ok and verify_ok:
         return "SUCCESS", {"ok": True}
     return "FAIL", {"ok": False, "exec_ok": exec_ok, "verify_ok": verify_ok}
 
-def run_task_once(*, cfg: TGConfig, store: TaskStore, task: Task, lane: str = "task_guardian") -> dict[str, Any]:
+def run_task_once(*, cfg: TGConfig, store: TaskStore, task: Task, lane: str = "task_guardian",
+                  memory_events: list[str] | None = None) -> dict[str, Any]:
     log_file = cfg.log_dir / "task_guardian.log"
-    params = json.loads(task.params_json)
+    params = _parse_params(task.params_json)
 
-    output_path = (cfg.data_dir / task.output_path).resolve() if not Path(task.output_path).is_absolute() else Path(task.output_path)
+    # Absolute, normalized path without resolve()'s per-component lstat calls;
+    # an absolute task.output_path replaces data_dir in join().
+    output_path = Path(os.path.abspath(os.path.join(cfg.data_dir, task.output_path)))
 
     run_id = new_run_id()
     started_at = now_iso()
@@ -28,9 +59,7 @@ def run_task_once(*, cfg: TGConfig, store: TaskStore, task: Task, lane: str = "t
     store.create_run(run_id=run_id, task_id=task.id, started_at=started_at, output_path=str(output_path),
                      meta={"tool": task.tool, "schedule": task.schedule, "expected": task.expected})
 
-    remember_if_available(session_id="task_guardian", role="SYSTEM",
-                         content=f"Task started: {task.id} | {task.name} | tool={task.tool} | run_id={run_id}",
-                         data_dir=str(cfg.data_dir))
+    _remember(cfg, f"Task started: {task.id} | {task.name} | tool={task.tool} | run_id={run_id}", memory_events)
 
     log_line(log_file, f"--- Task start {task.id} ({task.name}) run_id={run_id} ---")
 
@@ -40,25 +69,29 @@ def run_task_once(*, cfg: TGConfig, store: TaskStore, task: Task, lane: str = "t
 
         if tool in ("exec", "gh"):
             cmd = params.get("command", "")
-            ok, text, meta = run_subprocess_and_capture(cmd=cmd, timeout=timeout, log_file=log_file)
-            _write_output(output_path, text)
+            ok, meta = run_subprocess_and_capture(cmd=cmd, timeout=timeout, log_file=log_file, output_path=output_path)
             return {"ok": ok, "message": f"Exit code: {meta.get('returncode')}", "meta": meta, "output_path": str(output_path)}
 
         if tool == "http_request":
             url = params.get("url", "")
-            cmd = f"curl -sS --max-time {timeout} {json.dumps(url)}"
-            ok, text, meta = run_subprocess_and_capture(cmd=cmd, timeout=timeout+5, log_file=log_file)
-            _write_output(output_path, text)
+            cmd = ["curl", "-sS", "--max-time", str(timeout), url]
+            ok, meta = run_subprocess_and_capture(cmd=cmd, timeout=timeout+5, log_file=log_file, output_path=output_path)
             return {"ok": ok, "message": f"HTTP exit code: {meta.get('returncode')}", "meta": meta, "output_path": str(output_path)}
 
         _write_output(output_path, f"Unknown tool: {tool}")
         return {"ok": False, "message": f"Unknown tool: {tool}", "meta": {"tool": tool}, "output_path": str(output_path)}
 
+    verify = verifier(task.verify)
+
+    # The guard calls validate() on the result it hands back; remember that
+    # verdict so we don't verify the same output a second time below.
+    validated: list[tuple[Any, Tuple[str, Dict[str, Any]]]] = []
+
     def validate(result: dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
-        v = verifier(task.verify)
-        verify_ok, verify_msg = v(output_path)
+        verify_ok, verify_msg = verify(output_path)
         tier, meta = _tier(bool(result.get("ok")), verify_ok)
         meta.update({"verify_msg": verify_msg})
+        validated[:] = [(result, (tier, dict(meta)))]
         return tier, meta
 
     result = exec_with_guard_if_available(
@@ -72,23 +105,27 @@ def run_task_once(*, cfg: TGConfig, store: TaskStore, task: Task, lane: str = "t
         metadata={"run_id": run_id, "task_name": task.name, "tg_lane": lane, "tg_agent": "task_guardian"},
     )
 
-    tier, vmeta = validate(result)
+    if validated and validated[0][0] is result:
+        tier, vmeta = validated[0][1]
+    else:
+        tier, vmeta = validate(result)
     finished_at = now_iso()
     final_ok = (tier.upper() == "SUCCESS")
     status = "success" if final_ok else "fail"
     message = f"{status.upper()} | {result.get('message','')}".strip()
 
-    store.finish_run(run_id=run_id, status=status, message=message, finished_at=finished_at, meta_updates=vmeta)
-
     try:
         nxt = next_run_iso(task.schedule)
     except Exception:
         nxt = None
-    store.set_next_run(task.id, nxt)
 
-    remember_if_available(session_id="task_guardian", role="SYSTEM",
-                         content=f"Task finished: {task.id} | {task.name} | status={status} | run_id={run_id} | output={output_path}",
-                         data_dir=str(cfg.data_dir))
+    # Recording the result and rescheduling commit together.
+    with store.transaction():
+        store.finish_run(run_id=run_id, status=status, message=message, finished_at=finished_at, meta_updates=vmeta)
+        store.set_next_run(task.id, nxt)
+
+    _remember(cfg, f"Task finished: {task.id} | {task.name} | status={status} | run_id={run_id} | output={output_path}",
+              memory_events)
 
     log_line(log_file, f"--- Task end {task.id} status={status} next_run_at={nxt} ---")
 
@@ -105,6 +142,8 @@ def run_task_id(*, cfg: TGConfig, task_id: str) -> dict[str, Any]:
     return {"ok": True, "result": result}
 
 def run_due(*, cfg: TGConfig, limit: int = 25, marker_name: str | None = None, active_markers_only: bool = False) -> dict[str, Any]:
+    # Load the optional integrations in the background while we query for due tasks.
+    threading.Thread(target=_prewarm_integrations, name="tg-prewarm", daemon=True).start()
     store = TaskStore(cfg.db_path)
     now = utc_now_iso()
     fail_fast = os.getenv('TG_FAIL_FAST','0') == '1'
@@ -127,17 +166,32 @@ def run_due(*, cfg: TGConfig, limit: int = 25, marker_name: str | None = None, a
         due = store.due_tasks(now_iso=now, limit=limit)
 
     log_file = cfg.log_dir / "task_guardian.log"
-    log_line(log_file, f"RUN_DUE: {len(due)} tasks due (limit={limit})")
+    events: list[str] = []
 
-    results = []
-    for t in due:
+    def run_one(t: Task) -> dict[str, Any]:
         try:
-            results.append(run_task_once(cfg=cfg, store=store, task=t))
+            return run_task_once(cfg=cfg, store=store, task=t, memory_events=events)
         except Exception as e:
             try:
                 store.set_next_run(t.id, next_run_iso(t.schedule))
             except Exception:
                 store.set_next_run(t.id, None)
-            results.append({"task_id": t.id, "name": t.name, "status": "fail", "message": str(e)})
+            return {"task_id": t.id, "name": t.name, "status": "fail", "message": str(e)}
+
+    workers = min(len(due), _workers())
+    # Log file writes and memory events go out once for the whole batch.
+    with LogBuffer():
+        log_line(log_file, f"RUN_DUE: {len(due)} tasks due (limit={limit})")
+        if workers <= 1:
+            results = [run_one(t) for t in due]
+        else:
+            # Tasks mostly wait on their subprocess; the store serializes its
+            # own access, so they can overlap. Results keep the due order.
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tg-task") as ex:
+                results = list(ex.map(run_one, due))
+    if events:
+        remember_if_available(session_id="task_guardian", role="SYSTEM", content="\n".join(events),
+                              data_dir=str(cfg.data_dir))
 
     return {"now": now, "count": len(results), "results": results}
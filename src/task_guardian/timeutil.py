@@ -0,0 +1,18 @@
+from __future__ import annotations
+import time
+
+# (second, "YYYY-MM-DDTHH:MM:SS") for the last second formatted; calls within
+# the same second only format the microseconds. Swapped as one tuple, so
+# concurrent callers never see a mismatched pair.
+_PREFIX: tuple[int, str] = (-1, "")
+
+def utc_now_iso() -> str:
+    # Same shape as datetime.now(timezone.utc).isoformat(), but built from
+    # time_ns() without allocating a datetime; microseconds are always present.
+    global _PREFIX
+    s, us = divmod(time.time_ns() // 1000, 1_000_000)
+    sec, prefix = _PREFIX
+    if sec != s:
+        prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(s))
+        _PREFIX = (s, prefix)
+    return f"{prefix}.{us:06d}+00:00"
@@ -0,0 +1,128 @@
+"""TaskStore migrations, the active_marker_tasks triggers and the meta format setting."""
+from __future__ import annotations
+
+import random
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from task_guardian import store as store_mod
+from task_guardian.store import MIGRATIONS, SCHEMA, TaskStore
+
+# What due_tasks_active_markers_only joined before active_marker_tasks existed.
+_OLD_ACTIVE_JOIN = """
+SELECT DISTINCT mt.task_id FROM marker_tasks mt
+JOIN markers m ON m.marker_id = mt.marker_id
+WHERE m.status='active'
+"""
+
+
+def _task_row(i: int) -> tuple:
+    created = f"2026-01-01T00:00:{i:02d}Z"
+    next_run = None if i % 3 == 0 else f"2026-01-02T00:00:{i:02d}Z"
+    return (f"t{i}", f"task {i}", "shell", "{}", "@daily", "", "file_exists", f"out/{i}.txt", i % 4 != 0,
+            created, created, next_run)
+
+
+class StoreTestCase(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.db = Path(tmp.name) / "tg.db"
+
+    def open(self) -> TaskStore:
+        s = TaskStore(self.db)
+        self.addCleanup(s.close)
+        return s
+
+
+class ActiveMarkerTasksMatchesJoin(StoreTestCase):
+    def test_random_operations(self):
+        s = self.open()
+        for i in range(12):
+            t = _task_row(i)
+            s.upsert_task(task_id=t[0], name=t[1], tool=t[2], params={}, schedule=t[4], expected=t[5],
+                          verify=t[6], output_path=t[7], enabled=t[8], next_run_at=t[11])
+        rng = random.Random(7)
+        markers: list[str] = []
+        created = 0
+        for step in range(1500):
+            op = rng.random()
+            if op < 0.15 or not markers:
+                # Fresh ids, as the CLI uses random ones.
+                name = f"m{created}"
+                created += 1
+                s.create_marker(marker_id=f"id-{name}", name=name)
+                markers.append(name)
+            elif op < 0.5:
+                s.add_task_to_marker(marker_name=rng.choice(markers), task_id=f"t{rng.randrange(12)}")
+            elif op < 0.65:
+                s.close_marker(name=rng.choice(markers))
+            elif op < 0.75:
+                s.reset_marker(name=rng.choice(markers))
+            elif op < 0.9:
+                with s.transaction() as c:
+                    c.execute("DELETE FROM marker_tasks WHERE marker_id=? AND task_id=?",
+                              (f"id-{rng.choice(markers)}", f"t{rng.randrange(12)}"))
+            else:
+                name = markers.pop(rng.randrange(len(markers)))
+                with s.transaction() as c:
+                    c.execute("DELETE FROM markers WHERE marker_id=?", (f"id-{name}",))
+                    if rng.random() < 0.5:
+                        c.execute("DELETE FROM marker_tasks WHERE marker_id=?", (f"id-{name}",))
+            with s._read() as c:
+                got = {r[0] for r in c.execute("SELECT task_id FROM active_marker_tasks")}
+                want = {r[0] for r in c.execute(_OLD_ACTIVE_JOIN)}
+            self.assertEqual(got, want, f"after step {step}")
+
+
+class Migrations(StoreTestCase):
+    def test_upgrades_baseline_schema(self):
+        c = sqlite3.connect(self.db)
+        c.executescript(SCHEMA)
+        c.executemany("INSERT INTO tasks VALUES (?,?,?,?,?,?,?,?,?,?,?,?)", [_task_row(i) for i in range(6)])
+        c.executemany("INSERT INTO markers VALUES (?,?,?,?,?)", [
+            ("ma", "a", "active", "2026-01-01T00:00:00Z", None),
+            ("mb", "b", "closed", "2026-01-01T00:00:00Z", "2026-01-01T01:00:00Z"),
+        ])
+        c.executemany("INSERT INTO marker_tasks VALUES (?,?,?)", [
+            ("ma", "t1", "x"), ("ma", "t2", "x"), ("mb", "t2", "x"), ("mb", "t3", "x"),
+        ])
+        c.commit()
+        c.close()
+
+        s = self.open()
+        with s._read() as c:
+            self.assertEqual(c.execute("PRAGMA user_version").fetchone()[0], len(MIGRATIONS))
+            active = {r[0] for r in c.execute("SELECT task_id FROM active_marker_tasks")}
+            effective = dict(c.execute("SELECT id, effective_next_run_at FROM tasks").fetchall())
+        self.assertEqual(active, {"t1", "t2"})
+        self.assertEqual(effective, {r[0]: r[11] or r[9] for r in map(_task_row, range(6))})
+
+        # Reopening is a no-op.
+        s.close()
+        with self.open()._read() as c:
+            self.assertEqual(c.execute("PRAGMA user_version").fetchone()[0], len(MIGRATIONS))
+
+
+class MetaFormat(StoreTestCase):
+    def test_recorded_on_first_open(self):
+        s = self.open()
+        with s._read() as c:
+            fmt = c.execute("SELECT value FROM settings WHERE key=?", (store_mod._META_FORMAT_KEY,)).fetchone()[0]
+        self.assertEqual(fmt, "jsonb" if store_mod._HAS_JSONB else "text")
+
+    def test_refuses_jsonb_database_without_jsonb_support(self):
+        s = self.open()
+        with s.transaction() as c:
+            c.execute("UPDATE settings SET value='jsonb' WHERE key=?", (store_mod._META_FORMAT_KEY,))
+        s.close()
+        with mock.patch.object(store_mod, "_HAS_JSONB", False):
+            with self.assertRaisesRegex(RuntimeError, "JSONB"):
+                TaskStore(self.db)
+
+
+if __name__ == "__main__":
+    unittest.main()